@@ -4,6 +4,8 @@ Interactive REPL agent using zep-cloud for memory management.
 Demonstrates memory recall and storage with optional Anthropic integration.
 """
 import os
+import sys
+import tracemalloc
 from dotenv import load_dotenv
 from zep_cloud import Zep
 from zep_cloud.types import Message
@@ -17,9 +19,14 @@ except ImportError:
 
 
 class MemoryAgent:
-    def __init__(self):
+    def __init__(self, profile: bool = False):
         load_dotenv()
         
+        # Optional allocation tracing (type 'mem' in the REPL for a report)
+        self.profile = profile
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        
         # Initialize Zep client
         zep_api_key = os.getenv("ZEP_API_KEY")
         if not zep_api_key or zep_api_key == "your_zep_key_here":
@@ -89,6 +96,20 @@ Use this context to provide relevant, personalized responses. Reference previous
         else:
             return f"[No LLM configured] Echo: {user_message}"
     
+    def print_memory_report(self, limit: int = 10):
+        """Print traced memory and the top allocation sites."""
+        if not tracemalloc.is_tracing():
+            print("Memory profiling is off (start with --profile)")
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"\n📊 Traced memory: {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB)")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        for stat in snapshot.statistics("lineno")[:limit]:
+            print(f"  {stat}")
+    
     def run(self):
         """Main REPL loop."""
         while True:
@@ -96,12 +117,20 @@ Use this context to provide relevant, personalized responses. Reference previous
                 # Get user input
                 user_input = input("\n🤖 You: ").strip()
                 if user_input.lower() in ['quit', 'exit', 'q']:
+                    if self.profile:
+                        self.print_memory_report()
                     print("Goodbye!")
                     break
                 
                 if not user_input:
                     continue
                 
+                if user_input.lower() == 'mem':
+                    self.print_memory_report()
+                    continue
+                
+                before = tracemalloc.get_traced_memory()[0] if self.profile else 0
+                
                 # Step 2: Retrieve memory context
                 print("\n📝 Retrieving memory context...")
                 memory_context = self.get_memory_context()
@@ -117,6 +146,10 @@ Use this context to provide relevant, personalized responses. Reference previous
                 self.add_to_memory(user_input, assistant_response)
                 print("Stored successfully!")
                 
+                if self.profile:
+                    delta = tracemalloc.get_traced_memory()[0] - before
+                    print(f"📊 Turn allocations retained: {delta / 1024:+.1f} KiB")
+                
             except KeyboardInterrupt:
                 print("\n\nGoodbye!")
                 break
@@ -126,7 +159,7 @@ Use this context to provide relevant, personalized responses. Reference previous
 
 def main():
     try:
-        agent = MemoryAgent()
+        agent = MemoryAgent(profile="--profile" in sys.argv)
         agent.run()
     except Exception as e:
         print(f"Failed to initialize agent: {e}")
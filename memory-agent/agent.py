@@ -1,11 +1,17 @@
 import os
+import sys
 import asyncio
 import uuid
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from zep_cloud.client import AsyncZep
 from zep_cloud.types import Message
 from openai import OpenAI
 
+# app/ is not a package; import its modules by name, as server.py does.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+from memprofile import MemoryProfiler
+
 # ── Config ─────────────────────────────────────────────────────────────────────
 # Choose a stable user & thread so you can see data in Zep's dashboard:
 USER_ID = "james-user"                     # <-- change if you like
@@ -92,7 +98,7 @@ async def add_turns_and_get_context(user_text: str, recent_window: list[str]) ->
     return assistant_text, context
 
 # ── Main (batch mode for Claude Code) ──────────────────────────────────────────
-async def main():
+async def main(profiler: MemoryProfiler | None = None):
     print(f"[user_id] {USER_ID}")
     print(f"[thread_id] {THREAD_ID}")
 
@@ -105,7 +111,8 @@ async def main():
     for user_text in BATCH_MESSAGES:
         print(f"\nYou: {user_text}")
 
-        assistant_text, context = await add_turns_and_get_context(user_text, recent_window)
+        with profiler.track("turn") if profiler else nullcontext():
+            assistant_text, context = await add_turns_and_get_context(user_text, recent_window)
 
         if context:
             print("\n[ZEP CONTEXT]\n" + context + "\n")
@@ -116,16 +123,22 @@ async def main():
         # keep a tiny local text window
         recent_window.append(f"User: {user_text}")
         recent_window.append(f"Assistant: {assistant_text}")
+        # only the last few lines are ever sent, so don't let the window grow
+        del recent_window[:-6]
+
+    if profiler:
+        profiler.print_report()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # --profile: trace allocations per turn and print a memory report at the end
+    asyncio.run(main(MemoryProfiler(sample_every=1).start() if "--profile" in sys.argv else None))
 
 # ── How to run ─────────────────────────────────────────────────────────────────
 # 1) Make sure your .env contains:
 #    ZEP_API_KEY=...
 #    OPENAI_API_KEY=...
 # 2) Run:
-#    python agent.py
+#    python agent.py              (add --profile for a tracemalloc memory report)
 # 3) View data in the Zep Dashboard:
 #    - Go to https://app.getzep.com (Dashboard)
 #    - Users ▸ james-user ▸ View Graph (and View Episodes)
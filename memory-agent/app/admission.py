@@ -0,0 +1,145 @@
+"""
+Admission control and degraded mode for the Flask server.
+
+AdmissionController caps how many /api/message requests run at once. Extra
+requests wait in a bounded queue for at most `queue_timeout` seconds; anything
+beyond that is rejected with Overloaded so the route can answer 503 straight
+away instead of tying up a worker on Zep and OpenAI.
+
+LatencyTracker keeps a moving average of Zep context latency. Once it passes
+the threshold the server stops fetching context on the request path (serving
+the precomputed context if there is one) and only lets an occasional probe
+through to notice when Zep recovers.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# LatencyTracker.decide() results
+LIVE = "live"    # healthy: call upstream as usual
+PROBE = "probe"  # degraded, but this caller should call upstream to measure it
+SKIP = "skip"    # degraded: don't call upstream
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded wait queue. max_concurrent <= 0 disables it."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, retry_after: int = 1):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self.rejected = 0
+
+    @contextmanager
+    def admit(self):
+        if self.max_concurrent <= 0:
+            yield
+            return
+
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise Overloaded("queue full", self.retry_after)
+                self._waiting += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise Overloaded("queue timeout", self.retry_after)
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "rejected": self.rejected,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+            }
+
+
+class LatencyTracker:
+    """Exponential moving average of upstream latency with a degrade threshold.
+
+    threshold <= 0 disables degraded mode. Nothing degrades until at least
+    `min_samples` calls have been recorded, so one slow cold-start call
+    cannot switch all traffic off memory context.
+    """
+
+    def __init__(self, threshold: float, alpha: float = 0.2, probe_interval: float = 5.0, min_samples: int = 5):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._average = None
+        self._samples = 0
+        self._last_probe = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples += 1
+            if self._average is None:
+                self._average = seconds
+            else:
+                self._average = self.alpha * seconds + (1 - self.alpha) * self._average
+
+    def record_failure(self, seconds: float):
+        """Record a failed call; a fast error must not look like a fast healthy call."""
+        self.record(max(seconds, self.threshold))
+
+    @property
+    def average(self):
+        with self._lock:
+            return self._average
+
+    def degraded(self) -> bool:
+        if self.threshold <= 0:
+            return False
+        with self._lock:
+            return self._samples >= self.min_samples and self._average > self.threshold
+
+    def decide(self) -> str:
+        """Return LIVE, PROBE or SKIP for the caller's upstream call.
+
+        While degraded, one caller per probe_interval gets PROBE so the
+        average can come back down once upstream recovers. A probe must
+        really call upstream (not a cache) or it measures nothing.
+        """
+        if not self.degraded():
+            return LIVE
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_probe >= self.probe_interval:
+                self._last_probe = now
+                return PROBE
+            return SKIP
+
+    def should_skip(self) -> bool:
+        """True if the caller should skip the upstream call right now."""
+        return self.decide() == SKIP
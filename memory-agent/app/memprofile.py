@@ -0,0 +1,179 @@
+"""
+tracemalloc-based memory profiling for the server and the batch agent.
+
+MemoryProfiler tracks net allocations per named section (a Flask route or an
+agent turn) and per thread, and reports overall growth against a baseline
+snapshot. Every `sample_every` calls of a section it also diffs the whole
+heap against that section's previous sample (`heap_growth_sampled`). That
+diff is process-wide, so it includes allocations made by other routes and
+threads in between; it points at what grew while the section was busy, not
+at what the section itself allocated. Per-thread figures are estimates:
+tracemalloc does not know which thread owns a block, so each section's net
+allocation is charged to the thread that ran it.
+"""
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+# Frames from the profiler itself and the import machinery are noise in reports.
+IGNORED_FILES = [tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>"]
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Peak, not current: kilobytes on Linux, bytes on macOS.
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def format_stats(stats, limit: int) -> list:
+    rows = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        row = {"site": f"{frame.filename}:{frame.lineno}", "size_bytes": stat.size, "count": stat.count}
+        if hasattr(stat, "size_diff"):
+            row["size_diff_bytes"] = stat.size_diff
+            row["count_diff"] = stat.count_diff
+        rows.append(row)
+    return rows
+
+
+class MemoryProfiler:
+    def __init__(self, frames: int = 10, sample_every: int = 100, top: int = 10, max_threads: int = 256):
+        self.frames = frames
+        self.sample_every = sample_every
+        self.top = top
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._sections = {}
+        self._section_snapshots = {}
+        self._threads = {}
+        self._baseline = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.reset_baseline()
+        return self
+
+    def stop(self):
+        tracemalloc.stop()
+        with self._lock:
+            self._baseline = None
+            self._section_snapshots.clear()
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, name) for name in IGNORED_FILES]
+        )
+
+    def reset_baseline(self):
+        """Use the current heap as the reference point for growth()."""
+        snapshot = self.take_snapshot()
+        with self._lock:
+            self._baseline = snapshot
+
+    def traced_bytes(self) -> int:
+        return tracemalloc.get_traced_memory()[0]
+
+    # ── Section tracking ───────────────────────────────────────────────
+    def begin(self) -> int:
+        return self.traced_bytes()
+
+    def end(self, name: str, before: int):
+        delta = self.traced_bytes() - before
+        thread = threading.current_thread()
+        with self._lock:
+            section = self._sections.setdefault(name, {"calls": 0, "net_bytes": 0, "heap_growth_sampled": []})
+            section["calls"] += 1
+            section["net_bytes"] += delta
+
+            if thread.ident not in self._threads and len(self._threads) >= self.max_threads:
+                alive = {t.ident for t in threading.enumerate()}
+                for ident in [i for i in self._threads if i not in alive]:
+                    del self._threads[ident]
+            entry = self._threads.setdefault(thread.ident, {"name": thread.name, "calls": 0, "net_bytes": 0})
+            entry["calls"] += 1
+            entry["net_bytes"] += delta
+
+            sample = self.sample_every > 0 and section["calls"] % self.sample_every == 0
+        if sample:
+            self._sample_section(name)
+
+    @contextmanager
+    def track(self, name: str):
+        before = self.begin()
+        try:
+            yield
+        finally:
+            self.end(name, before)
+
+    def _sample_section(self, name: str):
+        snapshot = self.take_snapshot()
+        with self._lock:
+            previous = self._section_snapshots.get(name)
+            self._section_snapshots[name] = snapshot
+        if previous is None:
+            return
+        growth = format_stats(snapshot.compare_to(previous, "lineno"), self.top)
+        with self._lock:
+            self._sections[name]["heap_growth_sampled"] = growth
+
+    # ── Reporting ──────────────────────────────────────────────────────
+    def growth(self, limit: int = None):
+        """Top allocation sites by growth since the baseline snapshot."""
+        with self._lock:
+            baseline = self._baseline
+        if baseline is None:
+            return []
+        return format_stats(self.take_snapshot().compare_to(baseline, "lineno"), limit or self.top)
+
+    def report(self, limit: int = None) -> dict:
+        limit = limit or self.top
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = self.take_snapshot()
+        alive = {t.ident for t in threading.enumerate()}
+        with self._lock:
+            sections = {name: dict(stats) for name, stats in self._sections.items()}
+            threads = [dict(stats, ident=ident) for ident, stats in self._threads.items() if ident in alive]
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "rss_bytes": rss_bytes(),
+            "top_allocations": format_stats(snapshot.statistics("lineno"), limit),
+            "growth_since_baseline": self.growth(limit),
+            "sections": sections,
+            "threads": threads,
+        }
+
+    def dump(self, path: str) -> str:
+        """Write a raw tracemalloc snapshot (load with tracemalloc.Snapshot.load)."""
+        tracemalloc.take_snapshot().dump(path)
+        return path
+
+    def print_report(self, limit: int = None):
+        report = self.report(limit)
+        rss = report["rss_bytes"]
+        print("\n[memory profile]")
+        print(f"traced: {report['traced_current_bytes'] / 1024:.1f} KiB "
+              f"(peak {report['traced_peak_bytes'] / 1024:.1f} KiB)"
+              + (f", rss: {rss / 1024 / 1024:.1f} MiB" if rss else ""))
+        for name, stats in report["sections"].items():
+            print(f"  section {name}: {stats['calls']} calls, net {stats['net_bytes'] / 1024:+.1f} KiB")
+        for stats in report["threads"]:
+            print(f"  thread {stats['name']}: {stats['calls']} calls, net {stats['net_bytes'] / 1024:+.1f} KiB")
+        print("  top allocation sites:")
+        for row in report["top_allocations"]:
+            print(f"    {row['site']}: {row['size_bytes'] / 1024:.1f} KiB in {row['count']} blocks")
@@ -0,0 +1,245 @@
+"""
+Background fact extraction and context precomputation for the Flask server.
+
+After each write, the server hands the user's message to a ContextPrecomputer.
+A worker thread pulls simple personal facts (name, location, employer, hobbies,
+pets) out of the text into a compact per-user profile, then fetches the Zep
+context for the thread and caches the combined string. The next turn reads the
+cached string instead of waiting on Zep.
+
+Zep ingests messages asynchronously, so the worker fetches the context again
+`refresh_delay` seconds after each write, and cached entries expire after
+`ttl` seconds so reads fall back to Zep rather than serve an old copy.
+"""
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# ── Fact extraction ────────────────────────────────────────────────────
+# Single-valued facts: the most recent mention wins.
+_END = r"(?=\s+and\b|\s+on\b|[.,!?;]|$)"
+SINGLE_FACT_PATTERNS = {
+    "name": [
+        re.compile(r"\b(?i:my name is|i'm called|call me)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?)"),
+    ],
+    "location": [
+        re.compile(r"\b(?i:i live in|i'm based in|i am based in)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)"),
+        re.compile(r"\b(?i:i (?:train|work|study)(?:\s+\w+)?\s+in)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)"),
+    ],
+    "occupation": [
+        re.compile(r"\b(?i:i work as)\s+(?:an?\s+)?(.+?)(?=\s+at\b|\s+for\b|[.,!?;]|$)"),
+    ],
+    "employer": [
+        re.compile(r"\b(?i:i work)(?:\s+as\s+.+?)?\s+(?i:at|for)\s+(.+?)" + _END),
+        re.compile(r"\b(?i:i (?:run|own))\s+([A-Z].*?)" + _END),
+    ],
+}
+
+# Words that can follow "I like" / "I train" without naming an activity
+# ("I love you", "I prefer not to say", "I train in Leeds", "I train every morning").
+_NOT_AN_OBJECT = (
+    r"(?!(?i:you|me|him|her|them|us|it|this|that|these|those|not|to|when|how|what|so"
+    r"|in|at|with|for|every|each|on|the|a|an|my|here|there|hard|daily|often|most|some)\b)"
+)
+
+# Multi-valued facts: every distinct mention is kept.
+LIST_FACT_PATTERNS = {
+    "hobbies": [
+        # Only a clause that starts with "I" ("I think I like pizza" is a hedge, not a fact)
+        re.compile(r"(?:^|[,;]\s*|\band\s+)(?i:i(?:\s+also|\s+really)?\s+(?:love|enjoy|like|prefer))\s+"
+                   + _NOT_AN_OBJECT + r"(.+?)" + _END),
+        re.compile(r"\b(?i:i train)\s+" + _NOT_AN_OBJECT + r"([A-Za-z][\w-]*)"),
+        re.compile(r"\b(?i:my favou?rite (?:sport|hobby) is)\s+(.+?)" + _END),
+    ],
+    "pets": [
+        re.compile(r"\b(?i:pet)\s+(\w+)\s+(?i:named|called)\s+([A-Z]\w*)"),
+    ],
+}
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def extract_facts(text: str) -> dict:
+    """Return the personal facts stated in a single user message."""
+    facts = {}
+    for sentence in _SENTENCE_END.split((text or "").strip()):
+        # Questions ("Where do I train?") ask about facts rather than state them.
+        if not sentence or sentence.endswith("?"):
+            continue
+
+        for key, patterns in SINGLE_FACT_PATTERNS.items():
+            for pattern in patterns:
+                match = pattern.search(sentence)
+                if match:
+                    facts[key] = match.group(1).strip()
+                    break
+
+        for key, patterns in LIST_FACT_PATTERNS.items():
+            for pattern in patterns:
+                for match in pattern.finditer(sentence):
+                    facts.setdefault(key, []).append(" ".join(g.strip() for g in match.groups()))
+    return facts
+
+
+def merge_facts(profile: dict, facts: dict) -> dict:
+    """Merge newly extracted facts into a profile, de-duplicating list values."""
+    for key, value in facts.items():
+        if isinstance(value, list):
+            existing = profile.setdefault(key, [])
+            seen = {v.lower() for v in existing}
+            for item in value:
+                if item.lower() not in seen:
+                    existing.append(item)
+                    seen.add(item.lower())
+        else:
+            profile[key] = value
+    return profile
+
+
+def format_profile(profile: dict) -> str:
+    lines = []
+    for key, value in profile.items():
+        if isinstance(value, list):
+            value = ", ".join(value)
+        lines.append(f"- {key}: {value}")
+    return "\n".join(lines)
+
+
+def build_context(remote_context: str, profile: dict) -> str:
+    """Combine the Zep context with the local profile into one prompt block."""
+    parts = []
+    if remote_context:
+        parts.append(remote_context)
+    if profile:
+        parts.append("USER_PROFILE:\n" + format_profile(profile))
+    return "\n\n".join(parts)
+
+
+# ── Worker ─────────────────────────────────────────────────────────────
+class ContextPrecomputer:
+    """Runs fact extraction and context refresh off the request path.
+
+    `fetch_context` is called as fetch_context(thread_id) -> str from the
+    worker thread and must raise on failure; a failed fetch evicts the
+    thread's entry so reads go back to Zep. Cached contexts are kept for at
+    most `max_threads` threads, least recently used first out.
+    """
+
+    def __init__(self, fetch_context, max_queue: int = 1000, max_threads: int = 1000,
+                 ttl: float = 60.0, refresh_delay: float = 5.0):
+        self.fetch_context = fetch_context
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.refresh_delay = refresh_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._profiles = {}
+        # thread_id -> (context, fetched_at)
+        self._contexts = OrderedDict()
+        # thread_id -> (due, user_id); due times increase in insertion order
+        self._refreshes = OrderedDict()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="context-precompute", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, user_id: str, thread_id: str, user_text: str) -> bool:
+        """Queue a write for processing. Returns False if the queue is full."""
+        try:
+            self._queue.put_nowait((user_id, thread_id, user_text))
+            return True
+        except queue.Full:
+            print(f"Precompute queue full, dropping update for thread {thread_id}")
+            return False
+
+    def drain(self):
+        """Block until every queued update has been processed."""
+        self._queue.join()
+
+    def get(self, thread_id: str):
+        """Return the precomputed context for a thread, or None on a miss."""
+        with self._lock:
+            entry = self._contexts.get(thread_id)
+            if entry is None:
+                return None
+            context, fetched_at = entry
+            if time.monotonic() - fetched_at > self.ttl:
+                del self._contexts[thread_id]
+                return None
+            self._contexts.move_to_end(thread_id)
+            return context
+
+    def profile(self, user_id: str) -> dict:
+        with self._lock:
+            profile = self._profiles.get(user_id, {})
+            return {k: list(v) if isinstance(v, list) else v for k, v in profile.items()}
+
+    def process(self, user_id: str, thread_id: str, user_text: str) -> str:
+        """Extract facts from one message and refresh the thread's context."""
+        facts = extract_facts(user_text)
+        with self._lock:
+            merge_facts(self._profiles.setdefault(user_id, {}), facts)
+            if self.refresh_delay > 0:
+                self._refreshes.pop(thread_id, None)
+                self._refreshes[thread_id] = (time.monotonic() + self.refresh_delay, user_id)
+                while len(self._refreshes) > self.max_threads:
+                    self._refreshes.popitem(last=False)
+        return self.refresh(user_id, thread_id)
+
+    def refresh(self, user_id: str, thread_id: str) -> str:
+        """Fetch the thread's Zep context and cache it with the user's profile."""
+        try:
+            remote = self.fetch_context(thread_id)
+        except Exception:
+            with self._lock:
+                self._contexts.pop(thread_id, None)
+            raise
+
+        context = build_context(remote, self.profile(user_id))
+        with self._lock:
+            self._contexts[thread_id] = (context, time.monotonic())
+            self._contexts.move_to_end(thread_id)
+            while len(self._contexts) > self.max_threads:
+                self._contexts.popitem(last=False)
+        return context
+
+    def _due_refreshes(self):
+        """Pop the refreshes that are due; also return seconds until the next one."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._refreshes:
+                thread_id, (when, user_id) = next(iter(self._refreshes.items()))
+                if when > now:
+                    return due, when - now
+                del self._refreshes[thread_id]
+                due.append((user_id, thread_id))
+        return due, None
+
+    def _run(self):
+        timeout = None
+        while True:
+            try:
+                user_id, thread_id, user_text = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                try:
+                    self.process(user_id, thread_id, user_text)
+                except Exception as e:
+                    print(f"Precompute error for thread {thread_id}: {e}")
+                finally:
+                    self._queue.task_done()
+
+            due, timeout = self._due_refreshes()
+            for user_id, thread_id in due:
+                try:
+                    self.refresh(user_id, thread_id)
+                except Exception as e:
+                    print(f"Context refresh error for thread {thread_id}: {e}")
@@ -1,11 +1,16 @@
 import os
+import tempfile
+import time
 import uuid
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 from zep_cloud.client import Zep, AsyncZep
 from zep_cloud.types import Message
 from openai import OpenAI
+from precompute import ContextPrecomputer
+from admission import PROBE, SKIP, AdmissionController, LatencyTracker, Overloaded
+from memprofile import MemoryProfiler
 
 # ── Config ─────────────────────────────────────────────────────────────
 USER_ID = "james-user"
@@ -18,6 +23,21 @@ load_dotenv()
 ZEP_API_KEY = os.getenv("ZEP_API_KEY")
 ZEP_API_URL = os.getenv("ZEP_API_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Extract user facts and precompute context in the background after each write
+PRECOMPUTE_CONTEXT = os.getenv("PRECOMPUTE_CONTEXT", "").lower() in {"1", "true", "yes"}
+# Re-fetch after Zep has had time to ingest the write; expire cached context after the TTL
+PRECOMPUTE_REFRESH_SECONDS = float(os.getenv("PRECOMPUTE_REFRESH_SECONDS", "5"))
+PRECOMPUTE_TTL_SECONDS = float(os.getenv("PRECOMPUTE_TTL_SECONDS", "60"))
+# Load shedding for /api/message (MAX_CONCURRENT_REQUESTS=0 disables it)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "16"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "2.0"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+# Skip Zep context on the request path once its average latency passes this (0 disables)
+DEGRADE_LATENCY_SECONDS = float(os.getenv("DEGRADE_LATENCY_SECONDS", "2.0"))
+# tracemalloc profiling, reported at /api/debug/memory
+MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "").lower() in {"1", "true", "yes"}
+MEMORY_PROFILE_DIR = os.getenv("MEMORY_PROFILE_DIR", tempfile.gettempdir())
 
 if not ZEP_API_KEY:
     raise RuntimeError("Missing ZEP_API_KEY in .env")
@@ -30,6 +50,23 @@ openai_client = OpenAI(api_key=OPENAI_API_KEY)
 app = Flask(__name__, static_folder="static")
 CORS(app)
 
+admission = AdmissionController(
+    MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS, RETRY_AFTER_SECONDS
+)
+zep_latency = LatencyTracker(DEGRADE_LATENCY_SECONDS)
+profiler = MemoryProfiler().start() if MEMORY_PROFILE else None
+
+@app.before_request
+def begin_memory_tracking():
+    if profiler:
+        g.mem_before = profiler.begin()
+
+@app.teardown_request
+def end_memory_tracking(exc):
+    if profiler and "mem_before" in g:
+        # One key for every unmatched URL, so scanners can't grow the section table
+        profiler.end(request.endpoint or "<unmatched>", g.mem_before)
+
 # ── Helpers ─────────────────────────────────────────────────────────────
 def ensure_user():
     """Create or update the user profile in Zep."""
@@ -61,10 +98,20 @@ def create_thread():
         traceback.print_exc()
         raise
 
-def get_context(thread_id: str):
+def fetch_context(thread_id: str):
+    """Fetch the thread's context from Zep; raises on failure."""
+    start = time.monotonic()
     try:
         mem = zep.thread.get_user_context(thread_id=thread_id)
-        return mem.context if mem and getattr(mem, "context", "") else ""
+    except Exception:
+        zep_latency.record_failure(time.monotonic() - start)
+        raise
+    zep_latency.record(time.monotonic() - start)
+    return mem.context if mem and getattr(mem, "context", "") else ""
+
+def get_context(thread_id: str):
+    try:
+        return fetch_context(thread_id)
     except Exception as e:
         print(f"Context retrieval error: {e}")
         return ""
@@ -76,6 +123,24 @@ def add_messages(thread_id: str, user_text: str, assistant_text: str):
     ]
     zep.thread.add_messages(thread_id=thread_id, messages=messages)
 
+precomputer = ContextPrecomputer(
+    fetch_context, ttl=PRECOMPUTE_TTL_SECONDS, refresh_delay=PRECOMPUTE_REFRESH_SECONDS
+).start() if PRECOMPUTE_CONTEXT else None
+
+def get_context_fast(thread_id: str, allow_remote: bool = True, probe: bool = False):
+    """Serve the precomputed context when there is one, else ask Zep.
+
+    With allow_remote=False a cache miss returns "" instead of calling Zep.
+    With probe=True the cache is bypassed so the call measures Zep latency.
+    """
+    if precomputer and not probe:
+        context = precomputer.get(thread_id)
+        if context is not None:
+            return context
+    if not allow_remote:
+        return ""
+    return get_context(thread_id)
+
 def call_openai_with_context(context: str, user_text: str) -> str:
     full_system = f"{SYSTEM_PROMPT}\n\nMEMORY_CONTEXT:\n{context}"
     resp = openai_client.chat.completions.create(
@@ -104,6 +169,18 @@ def api_start():
 
 @app.route("/api/message", methods=["POST"])
 def api_message():
+    try:
+        with admission.admit():
+            return handle_message()
+    except Overloaded as e:
+        print(f"Shedding /api/message: {e.reason} {admission.stats()}")
+        return (
+            jsonify({"error": "Server is busy, please retry shortly"}),
+            503,
+            {"Retry-After": str(e.retry_after)},
+        )
+
+def handle_message():
     try:
         data = request.json
         print(f"Received data: {data}")
@@ -114,8 +191,13 @@ def api_message():
             print(f"Missing data - thread_id: {thread_id}, text: {text}")
             return jsonify({"error": "Missing thread_id or text"}), 400
 
-        print(f"Getting context for thread: {thread_id}")
-        context = get_context(thread_id)
+        mode = zep_latency.decide()
+        degraded = mode == SKIP
+        if degraded:
+            print(f"Degraded mode (Zep avg {zep_latency.average:.2f}s), skipping live context")
+        else:
+            print(f"Getting context for thread: {thread_id}")
+        context = get_context_fast(thread_id, allow_remote=not degraded, probe=mode == PROBE)
         print(f"Context retrieved: {context[:100] if context else 'None'}...")
         
         print(f"Calling OpenAI with text: {text}")
@@ -126,7 +208,10 @@ def api_message():
         add_messages(thread_id, text, assistant_text)
         print(f"Messages added successfully")
 
-        return jsonify({"assistant": assistant_text, "context": context})
+        if precomputer:
+            precomputer.submit(USER_ID, thread_id, text)
+
+        return jsonify({"assistant": assistant_text, "context": context, "degraded": degraded})
     except Exception as e:
         print(f"ERROR in api_message: {str(e)}")
         import traceback
@@ -139,11 +224,46 @@ def api_context():
         thread_id = request.args.get("thread_id")
         if not thread_id:
             return jsonify({"error": "Missing thread_id"}), 400
-        context = get_context(thread_id)
+        context = get_context_fast(thread_id)
         return jsonify({"thread_id": thread_id, "context": context})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/profile", methods=["GET"])
+def api_profile():
+    if not precomputer:
+        return jsonify({"error": "Profile extraction disabled (set PRECOMPUTE_CONTEXT=1)"}), 404
+    return jsonify({"user_id": USER_ID, "profile": precomputer.profile(USER_ID)})
+
+@app.route("/api/health", methods=["GET"])
+def api_health():
+    return jsonify({
+        "admission": admission.stats(),
+        "zep_latency_avg": zep_latency.average,
+        "degraded": zep_latency.degraded(),
+    })
+
+@app.route("/api/debug/memory", methods=["GET"])
+def api_debug_memory():
+    if not profiler:
+        return jsonify({"error": "Memory profiling disabled (set MEMORY_PROFILE=1)"}), 404
+    try:
+        limit = int(request.args.get("limit", profiler.top))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be at least 1"}), 400
+    try:
+        report = profiler.report(limit)
+        if request.args.get("dump", "").lower() in {"1", "true", "yes"}:
+            path = os.path.join(MEMORY_PROFILE_DIR, f"memory-{os.getpid()}-{int(time.time())}.tracemalloc")
+            report["snapshot_path"] = profiler.dump(path)
+        if request.args.get("reset", "").lower() in {"1", "true", "yes"}:
+            profiler.reset_baseline()
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ── Run ─────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
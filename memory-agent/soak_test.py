@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Memory soak test for the Flask server.
+Drives /api/message through Flask's test client with local stand-ins for the
+Zep and OpenAI clients (no API keys or network needed), then checks that
+traced memory stays flat once the server's bounded caches have filled up.
+
+    python soak_test.py                      # 100k turns
+    python soak_test.py --turns 20000 --turns-per-thread 2 --sample-every 2500
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+
+# Same facts as memory_test.py / agent.py so the profile extractor has work to do
+SOAK_MESSAGES = [
+    "Hi! My name is Alice and I live in San Francisco.",
+    "I work as a software engineer at a tech startup.",
+    "I love rock climbing on weekends and my favorite spot is Yosemite.",
+    "I prefer traditional climbing. I also have a pet cat named Whiskers.",
+    "My name is James.",
+    "I train MMA in Leeds.",
+    "I run Immortal Martial Arts.",
+    "What sport do I train?",
+    "Where do I train?",
+    "What's the name of my gym?",
+]
+
+
+class StubThreadAPI:
+    def create(self, thread_id, user_id):
+        return SimpleNamespace(thread_id=thread_id, user_id=user_id)
+
+    def add_messages(self, thread_id, messages):
+        return None
+
+    def get_user_context(self, thread_id):
+        return SimpleNamespace(context=f"FACTS for {thread_id}:\n- James trains MMA in Leeds.")
+
+
+class StubZep:
+    def __init__(self):
+        self.user = SimpleNamespace(add=lambda **kwargs: None)
+        self.thread = StubThreadAPI()
+
+
+class StubOpenAI:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        message = SimpleNamespace(content="Got it, I'll remember that.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def load_server():
+    """Import app/server.py with stub clients swapped in."""
+    os.environ["ZEP_API_KEY"] = "soak-test"
+    os.environ["OPENAI_API_KEY"] = "soak-test"
+    os.environ.setdefault("PRECOMPUTE_CONTEXT", "1")
+    sys.path.insert(0, APP_DIR)
+    import server
+    server.zep = StubZep()
+    server.openai_client = StubOpenAI()
+    return server
+
+
+def growth_per_turn(samples) -> float:
+    """Least-squares slope of traced bytes over turns; robust to per-sample noise."""
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+    variance = sum((x - mean_x) ** 2 for x, _ in samples)
+    return covariance / variance
+
+
+def run_soak(turns: int, turns_per_thread: int, sample_every: int,
+             max_interval_growth_kb: float, max_bytes_per_turn: float) -> bool:
+    server = load_server()
+    from memprofile import MemoryProfiler
+
+    # Growth is only meaningful once the bounded caches are full: warm up until
+    # the context cache has seen max_threads threads, plus one more interval.
+    max_threads = server.precomputer.max_threads if server.precomputer else 0
+    cache_fill = turns_per_thread * max_threads
+    warmup = (cache_fill // sample_every + 1) * sample_every
+    if turns < warmup + 2 * sample_every:
+        print(f"Need at least {warmup + 2 * sample_every} turns for two samples after warm-up "
+              f"({warmup} turns); got {turns}")
+        return False
+
+    client = server.app.test_client()
+    profiler = MemoryProfiler(frames=1).start()
+    samples = []
+    thread_id = None
+    started = time.monotonic()
+
+    print(f"Soaking /api/message for {turns} turns ({turns_per_thread} turns per thread, "
+          f"warm-up {warmup} turns)")
+    with open(os.devnull, "w") as devnull:
+        for i in range(turns):
+            if i % turns_per_thread == 0:
+                with redirect_stdout(devnull):
+                    thread_id = client.post("/api/start").get_json()["thread_id"]
+
+            with redirect_stdout(devnull):
+                resp = client.post("/api/message", json={
+                    "thread_id": thread_id,
+                    "text": SOAK_MESSAGES[i % len(SOAK_MESSAGES)],
+                })
+            if resp.status_code != 200:
+                print(f"Turn {i}: unexpected status {resp.status_code}: {resp.get_data(as_text=True)}")
+                return False
+
+            if (i + 1) % sample_every == 0:
+                if server.precomputer:
+                    server.precomputer.drain()
+                gc.collect()
+                if i + 1 == warmup:
+                    # take the baseline snapshot first so its own size isn't counted as growth
+                    profiler.reset_baseline()
+                traced = profiler.traced_bytes()
+                if i + 1 >= warmup:
+                    samples.append((i + 1, traced))
+                step = traced - samples[-2][1] if len(samples) > 1 else 0
+                print(f"  turn {i + 1:>7}: traced {traced / 1024:9.1f} KiB"
+                      + (f", interval growth {step / 1024:+8.1f} KiB" if len(samples) > 1 else ""))
+
+    elapsed = time.monotonic() - started
+    per_turn = growth_per_turn(samples)
+    worst = max(b - a for (_, a), (_, b) in zip(samples, samples[1:]))
+    print(f"\nFinished {turns} turns in {elapsed:.1f}s; after warm-up: {per_turn:+.2f} bytes/turn "
+          f"(limit {max_bytes_per_turn}), worst interval {worst / 1024:+.1f} KiB "
+          f"(limit {max_interval_growth_kb:.0f} KiB)")
+
+    if per_turn > max_bytes_per_turn or worst / 1024 > max_interval_growth_kb:
+        print("❌ Memory kept growing. Top growth sites since warm-up:")
+        for row in profiler.growth(15):
+            print(f"  {row['site']}: {row['size_diff_bytes'] / 1024:+.1f} KiB ({row['count_diff']:+} blocks)")
+        return False
+    print("✅ Memory stayed bounded")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory soak test for app/server.py")
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--turns-per-thread", type=int, default=20,
+                        help="start a new thread every N turns (exercises the context cache bound)")
+    parser.add_argument("--sample-every", type=int, default=10_000)
+    parser.add_argument("--max-interval-growth-kb", type=float, default=64,
+                        help="allowed traced-memory growth between two samples after warm-up")
+    parser.add_argument("--max-bytes-per-turn", type=float, default=1.0,
+                        help="allowed average growth per turn after warm-up")
+    args = parser.parse_args()
+
+    ok = run_soak(args.turns, args.turns_per_thread, args.sample_every,
+                  args.max_interval_growth_kb, args.max_bytes_per_turn)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app/ is not a package; server.py imports its siblings by module name.
+sys.path.insert(0, os.path.join(ROOT, "app"))
+# soak_test.py's stub clients are reused by the route tests
+sys.path.insert(0, ROOT)
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from admission import LIVE, PROBE, SKIP, AdmissionController, LatencyTracker, Overloaded
+
+
+def hold_slots(controller, count):
+    """Occupy `count` slots from background threads until the returned event is set."""
+    release = threading.Event()
+    entered = threading.Barrier(count + 1)
+
+    def worker():
+        with controller.admit():
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    entered.wait()
+    return release, threads
+
+
+def test_rejects_immediately_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=5)
+    release, threads = hold_slots(controller, 1)
+    start = time.monotonic()
+    with pytest.raises(Overloaded) as info:
+        with controller.admit():
+            pass
+    assert info.value.reason == "queue full"
+    assert time.monotonic() - start < 1
+    release.set()
+    [t.join() for t in threads]
+
+
+def test_rejects_after_queue_timeout():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.1, retry_after=3)
+    release, threads = hold_slots(controller, 1)
+    start = time.monotonic()
+    with pytest.raises(Overloaded) as info:
+        with controller.admit():
+            pass
+    assert info.value.reason == "queue timeout"
+    assert info.value.retry_after == 3
+    assert 0.1 <= time.monotonic() - start < 1
+    release.set()
+    [t.join() for t in threads]
+
+
+def test_waiter_gets_slot_when_one_is_freed():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    release, threads = hold_slots(controller, 1)
+    admitted = threading.Event()
+
+    def waiter():
+        with controller.admit():
+            admitted.set()
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    deadline = time.monotonic() + 2
+    while controller.stats()["waiting"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert controller.stats()["waiting"] == 1
+    assert not admitted.is_set()
+
+    release.set()
+    t.join(2)
+    assert admitted.is_set()
+    [t.join() for t in threads]
+
+
+def test_stats_track_active_waiting_and_rejected():
+    controller = AdmissionController(max_concurrent=2, max_queue=0, queue_timeout=1)
+    release, threads = hold_slots(controller, 2)
+    assert controller.stats()["active"] == 2
+    for _ in range(3):
+        with pytest.raises(Overloaded):
+            with controller.admit():
+                pass
+    release.set()
+    [t.join() for t in threads]
+    assert controller.stats() == {
+        "active": 0, "waiting": 0, "rejected": 3, "max_concurrent": 2, "max_queue": 0,
+    }
+
+
+def test_zero_limit_disables_admission_control():
+    controller = AdmissionController(max_concurrent=0, max_queue=0, queue_timeout=0)
+    with controller.admit():
+        with controller.admit():
+            pass
+
+
+def test_single_slow_sample_does_not_degrade():
+    tracker = LatencyTracker(threshold=2.0)
+    tracker.record(3.0)
+    assert not tracker.degraded()
+    for _ in range(4):
+        tracker.record(0.1)
+    assert not tracker.degraded()
+
+
+def test_sustained_latency_degrades_and_disabled_threshold_never_does():
+    tracker = LatencyTracker(threshold=2.0)
+    off = LatencyTracker(threshold=0)
+    for _ in range(5):
+        tracker.record(3.0)
+        off.record(3.0)
+    assert tracker.degraded()
+    assert not off.degraded()
+
+
+def test_probes_are_spaced_by_probe_interval():
+    tracker = LatencyTracker(threshold=1.0, probe_interval=0.2, min_samples=1)
+    assert tracker.decide() == LIVE
+    tracker.record(5.0)
+    assert tracker.decide() == PROBE
+    assert tracker.decide() == SKIP
+    assert tracker.should_skip()
+    time.sleep(0.25)
+    assert tracker.decide() == PROBE  # next probe after the interval
+    assert tracker.decide() == SKIP
+
+
+def test_fast_failures_do_not_pull_the_average_down():
+    tracker = LatencyTracker(threshold=1.0, min_samples=1)
+    tracker.record(5.0)
+    for _ in range(20):
+        tracker.record_failure(0.001)
+    assert tracker.average >= 1.0
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from precompute import ContextPrecomputer, build_context, extract_facts, merge_facts
+
+# Turns from memory_test.py and agent.py's BATCH_MESSAGES
+ALICE_TURNS = [
+    "Hi! My name is Alice and I live in San Francisco.",
+    "I work as a software engineer at a tech startup.",
+    "I love rock climbing on weekends and my favorite spot is Yosemite.",
+    "I prefer traditional climbing. I also have a pet cat named Whiskers.",
+]
+JAMES_TURNS = [
+    "My name is James.",
+    "I train MMA in Leeds.",
+    "I run Immortal Martial Arts.",
+    "What sport do I train?",
+    "Where do I train?",
+    "What's the name of my gym?",
+]
+
+
+def profile_from(turns):
+    profile = {}
+    for text in turns:
+        merge_facts(profile, extract_facts(text))
+    return profile
+
+
+def test_extracts_memory_test_facts():
+    assert profile_from(ALICE_TURNS) == {
+        "name": "Alice",
+        "location": "San Francisco",
+        "occupation": "software engineer",
+        "employer": "a tech startup",
+        "hobbies": ["rock climbing", "traditional climbing"],
+        "pets": ["cat Whiskers"],
+    }
+
+
+def test_extracts_batch_message_facts_and_ignores_questions():
+    assert profile_from(JAMES_TURNS) == {
+        "name": "James",
+        "location": "Leeds",
+        "employer": "Immortal Martial Arts",
+        "hobbies": ["MMA"],
+    }
+
+
+def test_question_only_skips_its_own_sentence():
+    assert extract_facts("My name is James. Where do I train?") == {"name": "James"}
+
+
+@pytest.mark.parametrize("text", [
+    "I think I like pizza.",
+    "I run Immortal Martial Arts and like Thai food.",
+])
+def test_like_needs_a_clause_starting_with_i(text):
+    assert "hobbies" not in extract_facts(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I love you.",
+    "I prefer not to say.",
+    "I like it when you remember things.",
+    "I really like that idea, thanks.",
+    "I enjoy to be honest.",
+])
+def test_like_ignores_objects_that_are_not_activities(text):
+    assert "hobbies" not in extract_facts(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I train in Leeds.",
+    "I train at Immortal Martial Arts.",
+    "I train every morning.",
+    "I train with my brother.",
+    "I train on Sundays.",
+])
+def test_train_ignores_prepositions_and_adverbs(text):
+    assert "hobbies" not in extract_facts(text)
+
+
+def test_train_still_records_the_activity():
+    assert extract_facts("I train boxing at Immortal Martial Arts.")["hobbies"] == ["boxing"]
+
+
+def test_merge_dedupes_lists_case_insensitively_and_latest_single_value_wins():
+    profile = profile_from(["I train MMA in Leeds.", "My favourite sport is mma and I live in York."])
+    assert profile["hobbies"] == ["MMA"]
+    assert profile["location"] == "York"
+
+
+def test_build_context_appends_profile_block():
+    assert build_context("FACTS", {"name": "James"}) == "FACTS\n\nUSER_PROFILE:\n- name: James"
+    assert build_context("", {}) == ""
+
+
+def test_cache_is_lru_bounded():
+    pc = ContextPrecomputer(lambda thread_id: f"ctx {thread_id}", max_threads=2, refresh_delay=0)
+    pc.process("u", "t1", "My name is James.")
+    pc.process("u", "t2", "I train MMA in Leeds.")
+    assert pc.get("t1") is not None  # t1 is now most recently used
+    pc.process("u", "t3", "I run Immortal Martial Arts.")
+    assert pc.get("t2") is None
+    assert pc.get("t1").startswith("ctx t1")
+    assert "- employer: Immortal Martial Arts" in pc.get("t3")
+
+
+def test_failed_fetch_evicts_instead_of_caching_empty_context():
+    calls = []
+
+    def fetch(thread_id):
+        calls.append(thread_id)
+        if len(calls) > 1:
+            raise ConnectionError("zep down")
+        return "FACTS"
+
+    pc = ContextPrecomputer(fetch, refresh_delay=0)
+    pc.process("u", "t1", "My name is James.")
+    assert pc.get("t1").startswith("FACTS")
+    with pytest.raises(ConnectionError):
+        pc.process("u", "t1", "I train MMA in Leeds.")
+    assert pc.get("t1") is None
+    assert pc.profile("u")["hobbies"] == ["MMA"]
+
+
+def test_entries_expire_after_ttl():
+    pc = ContextPrecomputer(lambda thread_id: "FACTS", ttl=0.05, refresh_delay=0)
+    pc.process("u", "t1", "My name is James.")
+    assert pc.get("t1") is not None
+    time.sleep(0.1)
+    assert pc.get("t1") is None
+
+
+def test_worker_refetches_after_write_to_pick_up_ingested_messages():
+    versions = iter(["before ingest", "after ingest"])
+    pc = ContextPrecomputer(lambda thread_id: next(versions, "after ingest"), refresh_delay=0.05).start()
+    pc.submit("u", "t1", "My name is James.")
+    pc.drain()
+    assert pc.get("t1").startswith("before ingest")
+    deadline = time.monotonic() + 2
+    while not pc.get("t1").startswith("after ingest") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pc.get("t1").startswith("after ingest")
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("zep_cloud")
+pytest.importorskip("openai")
+
+from admission import AdmissionController, LatencyTracker  # noqa: E402
+from memprofile import MemoryProfiler  # noqa: E402
+from soak_test import StubThreadAPI, load_server  # noqa: E402
+
+
+class CountingThreadAPI(StubThreadAPI):
+    def __init__(self):
+        self.context_calls = 0
+
+    def get_user_context(self, thread_id):
+        self.context_calls += 1
+        return super().get_user_context(thread_id)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = load_server()
+    threads = CountingThreadAPI()
+    monkeypatch.setattr(server.zep, "thread", threads)
+    monkeypatch.setattr(server, "admission", AdmissionController(1, 0, 0.1, retry_after=7))
+    monkeypatch.setattr(server, "zep_latency", LatencyTracker(1.0, min_samples=1, probe_interval=60))
+    server.threads = threads
+    return server
+
+
+def post_message(server, thread_id="t-route"):
+    return server.app.test_client().post("/api/message", json={"thread_id": thread_id, "text": "I train MMA."})
+
+
+def test_message_returns_503_with_retry_after_when_full(server):
+    with server.admission.admit():  # take the only slot; the queue holds nobody
+        resp = post_message(server)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "7"
+    assert server.threads.context_calls == 0
+
+
+def test_degraded_mode_answers_without_calling_zep(server):
+    server.zep_latency.record(5.0)
+    server.zep_latency.decide()  # the probe for this interval is used up
+
+    resp = post_message(server, thread_id=f"t-{time.monotonic()}")
+    assert resp.status_code == 200
+    assert resp.get_json()["degraded"] is True
+    assert server.threads.context_calls == 0
+
+
+def test_probe_bypasses_precomputed_context(server):
+    if server.precomputer:
+        server.precomputer.process(server.USER_ID, "t-probe", "My name is James.")
+    calls_before = server.threads.context_calls
+    server.zep_latency.record(5.0)
+
+    resp = post_message(server, thread_id="t-probe")
+    assert resp.get_json()["degraded"] is False
+    assert server.threads.context_calls == calls_before + 1
+
+
+@pytest.fixture
+def profiled(server, monkeypatch):
+    profiler = MemoryProfiler(frames=1, sample_every=0).start()
+    monkeypatch.setattr(server, "profiler", profiler)
+    yield server
+    profiler.stop()
+
+
+def test_unmatched_urls_share_one_profiler_section(profiled):
+    client = profiled.app.test_client()
+    for path in ["/wp-admin", "/.env", "/nope/1", "/nope/2"]:
+        assert client.get(path).status_code == 404
+    assert set(profiled.profiler.report()["sections"]) == {"<unmatched>"}
+
+
+def test_debug_memory_flags_need_a_true_value(profiled, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiled, "MEMORY_PROFILE_DIR", str(tmp_path))
+    client = profiled.app.test_client()
+    baseline = profiled.profiler._baseline
+
+    report = client.get("/api/debug/memory?dump=false&reset=0").get_json()
+    assert "snapshot_path" not in report
+    assert profiled.profiler._baseline is baseline
+    assert not list(tmp_path.iterdir())
+
+    report = client.get("/api/debug/memory?dump=1&reset=true").get_json()
+    assert report["snapshot_path"].startswith(str(tmp_path))
+    assert profiled.profiler._baseline is not baseline